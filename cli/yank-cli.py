@@ -1,8 +1,27 @@
 import os
+import sys
+import glob
 import time
+import random
+import atexit
+import argparse
+import threading
 import requests
-import re
+import functools
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait
 from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+try:
+    import readline
+except ImportError:
+    readline = None
 
 
 BLUE = "\033[38;2;34;136;255m"
@@ -18,10 +37,8 @@ TITLE = f"""{BLUE}                   _
                                  
 Spotify Track Downloader{RESET}
 """
-print(TITLE)
-print("Welcome to yank-cli - Your Spotify Track Saver!")
-print("=" * 47)
-print()
+WELCOME = "Welcome to yank-cli - Your Spotify Track Saver!"
+BANNER = f"{TITLE}\n{WELCOME}\n{'=' * 47}\n\n"
 
 API_REQUEST_HEADERS = {
     'Host': 'api.spotifydown.com',
@@ -29,149 +46,391 @@ API_REQUEST_HEADERS = {
     'Origin': 'https://spotifydown.com',
 }
 
-FILENAME_SANITIZATION_PATTERN = re.compile(r'[<>:\"\/\\|?*\|\']')
+MAX_CONCURRENT_DOWNLOADS = 8
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+PLAYLIST_PREFETCH_PAGES = 4
+REQUEST_TIMEOUT = (10, 30)
+STALE_PART_AGE = 2 * REQUEST_TIMEOUT[1]
+
+METADATA_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or Path.home() / ".cache") / "yank-cli"
+METADATA_CACHE_TTL = 60 * 60
+URL_HISTORY_FILE = Path(os.environ.get("XDG_STATE_HOME") or os.environ.get("APPDATA") or Path.home() / ".local" / "state") / "yank-cli" / "url_history"
+URL_HISTORY_LENGTH = 100
+CACHE_KEY_TABLE = str.maketrans('/?=&', '----')
+
+def create_session(headers=None):
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    # Retries are handled by call_with_retries, so the adapter never retries.
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=max(16, MAX_CONCURRENT_DOWNLOADS),
+        max_retries=0,
+    )
+    session.mount('https://', adapter)
+    return session
+
+SESSION = create_session(API_REQUEST_HEADERS)
+AUDIO_SESSION = create_session()
+
+FILENAME_DELETE_TABLE = str.maketrans('', '', '<>:"/\\|?*\'')
 
 @dataclass(init=True, eq=True, frozen=True)
 class TrackMetadata:
+    __slots__ = ('title', 'artists', 'album', 'tid', 'name', 'filename')
+
     title: str
     artists: str
     album: str
     tid: str
 
+    def __post_init__(self):
+        name = f"{self.title} - {self.artists}"
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'filename', name + ".mp3")
+
+def extract_spotify_id(link):
+    return link.rpartition("/")[2].partition("?")[0]
+
+@functools.lru_cache(maxsize=4096)
 def normalize_filename(name):
-    name = re.sub(FILENAME_SANITIZATION_PATTERN, '', name)
+    name = name.translate(FILENAME_DELETE_TABLE)
     name = ' '.join(name.split())
     return name.strip()
 
-def fetch_track_metadata(link, max_retries=3):
-    track_id = link.split("/")[-1].split("?")[0]
-    for attempt in range(max_retries):
+def call_with_retries(action, func, *args, failure_result=None, max_attempts=3, base_delay=0.5, max_delay=8.0, exceptions=(requests.RequestException, ValueError), **kwargs):
+    for attempt in range(max_attempts):
         try:
-            response = requests.get(f"https://api.spotifydown.com/download/{track_id}", headers=API_REQUEST_HEADERS)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"Error fetching track metadata. Retrying... (Attempt {attempt + 2}/{max_retries})")
-                time.sleep(2)
+            return func(*args, **kwargs)
+        except exceptions:
+            if attempt < max_attempts - 1:
+                log(f"Could not {action}. Retrying... (Attempt {attempt + 2}/{max_attempts})")
+                time.sleep(min(max_delay, base_delay * 2 ** attempt) + random.uniform(0, 0.1))
             else:
-                print(f"Failed to fetch track metadata after {max_retries} attempts.")
-                return None
+                log(f"Failed to {action} after {max_attempts} attempts.")
+    return failure_result
 
-def fetch_album_metadata(link, max_retries=3):
-    album_id = link.split("/")[-1].split("?")[0]
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(f"https://api.spotifydown.com/metadata/album/{album_id}", headers=API_REQUEST_HEADERS)
-            response.raise_for_status()
-            album_data = response.json()
-            album_name = album_data['title']
-            
-            print(f"Album: {album_name} by {album_data['artists']}")
-            print("Getting songs from album...")
-            
-            response = requests.get(f"https://api.spotifydown.com/tracklist/album/{album_id}", headers=API_REQUEST_HEADERS)
-            response.raise_for_status()
-            track_list = response.json()['trackList']
-
-            return [TrackMetadata(
-                title=normalize_filename(track['title']),
-                artists=normalize_filename(track['artists']),
-                album=album_name,
-                tid=track['id']
-            ) for track in track_list], album_name
-        except requests.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"Error fetching album metadata. Retrying... (Attempt {attempt + 2}/{max_retries})")
-                time.sleep(2)
-            else:
-                print(f"Failed to fetch album metadata after {max_retries} attempts.")
-                return None, None
+def retry(action, failure_result=None, **options):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return call_with_retries(action, func, *args, failure_result=failure_result, **options, **kwargs)
+        return wrapper
+    return decorator
 
-def fetch_playlist_metadata(link, max_retries=3):
-    playlist_id = link.split("/")[-1].split("?")[0]
-    for attempt in range(max_retries):
-        try:
-            response = requests.get(f"https://api.spotifydown.com/metadata/playlist/{playlist_id}", headers=API_REQUEST_HEADERS)
-            response.raise_for_status()
-            playlist_data = response.json()
-            playlist_name = playlist_data['title']
-            
-            print(f"Playlist: {playlist_name} by {playlist_data['artists']}")
-            print("Getting songs from playlist...")
+def fetch_api_json(endpoint, cache_dir=None):
+    data = read_metadata_cache(cache_dir, endpoint)
+    if data is not None:
+        return data
+    
+    data, content = request_api_json(endpoint)
+    if data.get('success') is not False:
+        write_metadata_cache(cache_dir, endpoint, content)
+    return data
+
+def request_api_json(endpoint):
+    response = SESSION.get(f"https://api.spotifydown.com/{endpoint}", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return json_loads(response.content), response.content
+
+def metadata_cache_path(cache_dir, endpoint):
+    return cache_dir / (endpoint.translate(CACHE_KEY_TABLE) + ".json")
+
+def read_metadata_cache(cache_dir, endpoint):
+    if not cache_dir:
+        return None
+    cache_path = metadata_cache_path(cache_dir, endpoint)
+    try:
+        if time.time() - cache_path.stat().st_mtime < METADATA_CACHE_TTL:
+            return json_loads(cache_path.read_bytes())
+        cache_path.unlink()
+    except (OSError, ValueError):
+        pass
+    return None
+
+def prune_metadata_cache(cache_dir):
+    # Expired entries that are never requested again would otherwise stay
+    # on disk forever, along with temp files from interrupted writes.
+    try:
+        with os.scandir(cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith((".json", ".tmp")) and time.time() - entry.stat().st_mtime >= METADATA_CACHE_TTL:
+                    os.remove(entry.path)
+    except OSError:
+        pass
+
+def write_metadata_cache(cache_dir, endpoint, content):
+    if not cache_dir:
+        return
+    cache_path = metadata_cache_path(cache_dir, endpoint)
+    partial_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path.write_bytes(content)
+        os.replace(partial_path, cache_path)
+    except OSError:
+        pass
+
+@retry("fetch track metadata", failure_result=None)
+def fetch_track_metadata(link, cache_dir=None):
+    track_id = extract_spotify_id(link)
+    return fetch_api_json(f"download/{track_id}", cache_dir)
+
+@retry("fetch album metadata", failure_result=(None, None))
+def fetch_album_metadata(link, cache_dir=None):
+    album_id = extract_spotify_id(link)
+    album_data = fetch_api_json(f"metadata/album/{album_id}", cache_dir)
+    album_name = album_data['title']
+    
+    print(f"Album: {album_name} by {album_data['artists']}")
+    print("Getting songs from album...")
+    
+    track_list = fetch_api_json(f"tracklist/album/{album_id}", cache_dir)['trackList']
+
+    return [TrackMetadata(
+        title=normalize_filename(track['title']),
+        artists=normalize_filename(track['artists']),
+        album=album_name,
+        tid=track['id']
+    ) for track in track_list], album_name
+
+def playlist_page_endpoint(playlist_id, offset):
+    return f"tracklist/playlist/{playlist_id}?offset={offset}"
+
+def fetch_playlist_page(playlist_id, offset, cache_dir=None):
+    data = read_metadata_cache(cache_dir, playlist_page_endpoint(playlist_id, offset))
+    if data is not None:
+        return data, None
+    return request_api_json(playlist_page_endpoint(playlist_id, offset))
+
+def fetch_playlist_tracklist(playlist_id, cache_dir=None):
+    track_list = []
+    
+    def use_page(offset, data, content=None):
+        if content is not None:
+            write_metadata_cache(cache_dir, playlist_page_endpoint(playlist_id, offset), content)
+        track_list.extend(data['trackList'])
+        return data['nextOffset']
+    
+    data, content = fetch_playlist_page(playlist_id, 0, cache_dir)
+    next_offset = use_page(0, data, content)
+    page_size = next_offset
+    
+    with ThreadPoolExecutor(max_workers=PLAYLIST_PREFETCH_PAGES) as executor:
+        while next_offset:
+            # Walk pages that are already cached without speculating, so a
+            # warm run never requests anything past the end of the playlist.
+            data = read_metadata_cache(cache_dir, playlist_page_endpoint(playlist_id, next_offset))
+            if data is not None:
+                next_offset = use_page(next_offset, data)
+                continue
             
-            track_list = []
-            next_offset = 0
-            while True:
-                response = requests.get(f"https://api.spotifydown.com/tracklist/playlist/{playlist_id}?offset={next_offset}", headers=API_REQUEST_HEADERS)
-                response.raise_for_status()
-                data = response.json()
-                track_list.extend(data['trackList'])
-                next_offset = data['nextOffset']
-                if not next_offset:
+            # The API only reports the next offset, so fetch the following
+            # pages speculatively in batches and stop at the first page
+            # without one. Pages past the end are never used, so a fetched
+            # page is only cached once its tracks have been taken.
+            offsets = [next_offset + i * page_size for i in range(PLAYLIST_PREFETCH_PAGES)]
+            pages = executor.map(lambda offset: request_api_json(playlist_page_endpoint(playlist_id, offset)), offsets)
+            for offset, (data, content) in zip(offsets, pages):
+                next_offset = use_page(offset, data, content)
+                if not next_offset or next_offset != offset + page_size:
                     break
+    return track_list
 
-            return [TrackMetadata(
-                title=normalize_filename(track['title']),
-                artists=normalize_filename(track['artists']),
-                album=track.get('album', 'Unknown Album'),
-                tid=track['id']
-            ) for track in track_list], playlist_name
-        except requests.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f"Error fetching playlist metadata. Retrying... (Attempt {attempt + 2}/{max_retries})")
-                time.sleep(2)
-            else:
-                print(f"Failed to fetch playlist metadata after {max_retries} attempts.")
-                return None, None
+@retry("fetch playlist metadata", failure_result=(None, None))
+def fetch_playlist_metadata(link, cache_dir=None):
+    playlist_id = extract_spotify_id(link)
+    playlist_data = fetch_api_json(f"metadata/playlist/{playlist_id}", cache_dir)
+    playlist_name = playlist_data['title']
+    
+    print(f"Playlist: {playlist_name} by {playlist_data['artists']}")
+    print("Getting songs from playlist...")
+    
+    track_list = fetch_playlist_tracklist(playlist_id, cache_dir)
+
+    return [TrackMetadata(
+        title=normalize_filename(track['title']),
+        artists=normalize_filename(track['artists']),
+        album=track.get('album', 'Unknown Album'),
+        tid=track['id']
+    ) for track in track_list], playlist_name
+
+def print_tracklist(tracks):
+    lines = [f"{i}. {track.name}" for i, track in enumerate(tracks, 1)]
+    lines.append("")
+    sys.stdout.write("\n".join(lines))
+
+def log(message):
+    # A single write per line, so lines from concurrent workers don't interleave.
+    sys.stdout.write(message + "\n")
+
+class DownloadCancelled(Exception):
+    pass
+
+def download_track(track, outpath, existing=None, cancelled=None):
+    if cancelled is not None and cancelled.is_set():
+        return False
+    log(f"Downloading: {track.name}")
+    try:
+        downloaded = call_with_retries(f"download {track.name}", persist_audio_file, track, outpath, existing, cancelled)
+    except DownloadCancelled:
+        return False
+    if downloaded is None:
+        return False
+    if downloaded:
+        log(f"Downloaded: {track.name}")
+    else:
+        log(f"Skipped (already exists): {track.name}")
+    return True
+
+def download_tracks(tracks, outpath):
+    print(f"\nDownloading {len(tracks)} track(s)...")
+    existing = list_existing_tracks(outpath)
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS)
+    futures = [executor.submit(download_track, track, outpath, existing, cancelled) for track in tracks]
+    try:
+        # Wait in short slices so Ctrl+C is delivered promptly on every platform.
+        pending = futures
+        while pending:
+            _, pending = wait(pending, timeout=0.5)
+    except KeyboardInterrupt:
+        # Stop queued downloads and have running ones drop their partial files
+        # instead of letting shutdown wait for every transfer to finish.
+        cancelled.set()
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+        raise
+    executor.shutdown()
+    return [future.result() for future in futures]
+
+def list_existing_tracks(outpath):
+    existing = set()
+    with os.scandir(outpath) as entries:
+        for entry in entries:
+            if entry.name.endswith(".mp3"):
+                existing.add(entry.name)
+            elif entry.name.endswith(".part"):
+                remove_stale_part(entry.path)
+    return existing
+
+def remove_stale_part(path):
+    # Live downloads write continuously, so an old .part file was left
+    # behind by a run that was killed before it could clean up.
+    try:
+        if time.time() - os.path.getmtime(path) > STALE_PART_AGE:
+            os.remove(path)
+    except OSError:
+        pass
 
-def download_track(track, outpath, max_retries=3):
-    trackname = f"{track.title} - {track.artists}"
-    print(f"Downloading: {trackname}", end="", flush=True)
+def persist_audio_file(track, outpath, existing=None, cancelled=None):
+    target = os.path.join(outpath, track.filename)
+    if existing is None:
+        if os.path.exists(target):
+            return False
+        for path in glob.glob(glob.escape(target) + ".*.part"):
+            remove_stale_part(path)
+    if existing is not None and track.filename in existing:
+        return False
     
-    for attempt in range(max_retries):
-        try:
-            if persist_audio_file(trackname, track.tid, outpath):
-                print(" Downloaded")
-                return True
-            else:
-                print(" Skipped (already exists)")
-                return True
-        except requests.RequestException as e:
-            if attempt < max_retries - 1:
-                print(f" Error downloading. Retrying... (Attempt {attempt + 2}/{max_retries})")
-                time.sleep(2)
-            else:
-                print(f" Failed to download after {max_retries} attempts.")
+    # Download into a private temp file and only publish complete files, so a
+    # killed process never leaves a truncated .mp3 that later runs would skip.
+    partial_path = f"{target}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with open(partial_path, "wb") as file, AUDIO_SESSION.get(f"https://yank.g3v.co.uk/track/{track.tid}", stream=True, timeout=REQUEST_TIMEOUT) as audio_response:
+            audio_response.raise_for_status()
+            if audio_response.status_code != 200:
                 return False
+            for chunk in audio_response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if cancelled is not None and cancelled.is_set():
+                    raise DownloadCancelled()
+                file.write(chunk)
+        return publish_file(partial_path, target)
+    finally:
+        try:
+            os.remove(partial_path)
+        except FileNotFoundError:
+            pass
 
-def persist_audio_file(trackname, tid, outpath):
-    trackname = normalize_filename(trackname)
-    if os.path.exists(os.path.join(outpath, f"{trackname}.mp3")):
+def publish_file(partial_path, target):
+    try:
+        os.link(partial_path, target)
+        return True
+    except FileExistsError:
         return False
+    except OSError:
+        pass
     
-    audio_response = requests.get(f"https://yank.g3v.co.uk/track/{tid}")
-    audio_response.raise_for_status()
-    
-    if audio_response.status_code == 200:
-        with open(os.path.join(outpath, f"{trackname}.mp3"), "wb") as file:
-            file.write(audio_response.content)
-        return True
-    return False
+    # Hard links are unavailable on some filesystems (e.g. FAT drives), so
+    # claim the name with an exclusive create and move the data over it.
+    try:
+        open(target, "xb").close()
+    except FileExistsError:
+        return False
+    os.replace(partial_path, target)
+    return True
+
+def warm_up_connections():
+    for session, url in ((SESSION, "https://api.spotifydown.com/"), (AUDIO_SESSION, "https://yank.g3v.co.uk/")):
+        try:
+            session.head(url, timeout=5)
+        except requests.RequestException:
+            pass
+
+def complete_from_history(text, state):
+    matches = [readline.get_history_item(i) for i in range(readline.get_current_history_length(), 0, -1)]
+    matches = [url for url in dict.fromkeys(matches) if url and url.startswith(text)]
+    return matches[state] if state < len(matches) else None
+
+def save_url_history():
+    try:
+        URL_HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        readline.write_history_file(URL_HISTORY_FILE)
+    except OSError:
+        pass
+
+def setup_url_history():
+    if readline is None:
+        return
+    readline.set_auto_history(False)
+    readline.set_history_length(URL_HISTORY_LENGTH)
+    try:
+        readline.read_history_file(URL_HISTORY_FILE)
+    except OSError:
+        pass
+    readline.set_completer_delims("")
+    readline.set_completer(complete_from_history)
+    readline.parse_and_bind("tab: complete")
+    atexit.register(save_url_history)
 
 def main():
+    parser = argparse.ArgumentParser(description="Download Spotify tracks, albums, and playlists.")
+    parser.add_argument("--no-cache", action="store_true", help="always fetch fresh metadata instead of using the local cache")
+    args = parser.parse_args()
+    cache_dir = None if args.no_cache else METADATA_CACHE_DIR
+    if cache_dir:
+        prune_metadata_cache(cache_dir)
+    
+    sys.stdout.write(BANNER)
+    threading.Thread(target=warm_up_connections, daemon=True).start()
     outpath = os.getcwd()
     
-    url = input("Enter Spotify track, album, or playlist URL: ")
+    setup_url_history()
+    url = input("Enter Spotify track, album, or playlist URL: ").strip()
+    if readline is not None:
+        readline.set_completer(None)
+        if url:
+            readline.add_history(url)
     
     if "album" in url:
-        songs, album_name = fetch_album_metadata(url)
+        songs, album_name = fetch_album_metadata(url, cache_dir)
         if songs is None:
             print("Failed to fetch album. Exiting.")
             return
         print("\nTracks in album:")
-        for i, song in enumerate(songs, 1):
-            print(f"{i}. {song.title} - {song.artists}")
+        print_tracklist(songs)
         
         selection = input("\nEnter track numbers to download (space-separated) or press Enter to download all: ")
         if selection.strip():
@@ -184,16 +443,14 @@ def main():
         outpath = os.path.join(outpath, album_folder)
         os.makedirs(outpath, exist_ok=True)
         
-        for song in selected_songs:
-            download_track(song, outpath)
+        download_tracks(selected_songs, outpath)
     elif "playlist" in url:
-        songs, playlist_name = fetch_playlist_metadata(url)
+        songs, playlist_name = fetch_playlist_metadata(url, cache_dir)
         if songs is None:
             print("Failed to fetch playlist. Exiting.")
             return
         print("\nTracks in playlist:")
-        for i, song in enumerate(songs, 1):
-            print(f"{i}. {song.title} - {song.artists}")
+        print_tracklist(songs)
         
         selection = input("\nEnter track numbers to download (space-separated) or press Enter to download all: ")
         if selection.strip():
@@ -206,10 +463,9 @@ def main():
         outpath = os.path.join(outpath, playlist_folder)
         os.makedirs(outpath, exist_ok=True)
         
-        for song in selected_songs:
-            download_track(song, outpath)
+        download_tracks(selected_songs, outpath)
     else:  # Single track
-        resp = fetch_track_metadata(url)
+        resp = fetch_track_metadata(url, cache_dir)
         if resp is None or resp.get('success') == False:
             print(f"Error: Unable to fetch track metadata.")
             return
@@ -226,4 +482,7 @@ def main():
     print("=" * 29)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nCancelled.")